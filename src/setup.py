@@ -76,8 +76,10 @@ def setup_notebook(notebook_name: str, colab_notebooks_dir: str = "colab_noteboo
         if source_path.exists():
             import shutil
             shutil.copy2(source_path, drive_path)
-            # Create symbolic link back to repository
-            os.system(f'ln -sf "{drive_path}" "{source_path}"')
+            # Create symbolic link back to repository (ln -sf semantics,
+            # without forking a shell)
+            source_path.unlink(missing_ok=True)
+            source_path.symlink_to(drive_path)
             logger.info(f"Notebook setup at: {drive_path}")
             logger.info("You can now open this notebook from Drive in File -> Open notebook")
             return drive_path
@@ -113,35 +115,49 @@ def mount_google_drive(google_drive_dir: str) -> Path:
 
 def install_requirements() -> None:
     """Install project dependencies from requirements.txt.
-    
+
+    Uses pip's in-process entry point when available, avoiding a full
+    interpreter re-exec; falls back to a single subprocess if the pip
+    internals have moved.
+
     Raises:
-        FileNotFoundError: If requirements.txt is not found
         subprocess.CalledProcessError: If pip installation fails
     """
+    pip_args = ['install', '-r', 'requirements.txt']
+    try:
+        from pip._internal.cli.main import main as pip_main
+    except ImportError:
+        pip_main = None
+
+    if pip_main is not None:
+        if pip_main(pip_args) == 0:
+            logger.info("Successfully installed requirements")
+            return
+        logger.error("Error installing requirements")
+        raise subprocess.CalledProcessError(returncode=1, cmd=['pip'] + pip_args)
+
     try:
-        subprocess.check_call(['pip', 'install', '-r', 'requirements.txt'])
+        subprocess.run(['pip'] + pip_args, check=True)
         logger.info("Successfully installed requirements")
     except subprocess.CalledProcessError as e:
         logger.error(f"Error installing requirements: {e}")
         raise
-    except FileNotFoundError:
-        logger.error("requirements.txt not found")
-        raise
 
 
 def check_gpu() -> bool:
     """Verify GPU availability and configuration.
-    
+
+    torch has already probed the driver, so no nvidia-smi subprocess
+    round-trip is needed.
+
     Returns:
         bool: True if GPU is available and properly configured
     """
-    try:
-        subprocess.run(['nvidia-smi'], check=True, capture_output=True)
+    if torch.cuda.is_available():
         logger.info("GPU configuration verified")
         return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        logger.warning("GPU not available, falling back to CPU")
-        return False
+    logger.warning("GPU not available, falling back to CPU")
+    return False
 
 
 def get_gcp_config() -> Optional[Dict[str, str]]:
@@ -186,11 +202,13 @@ def configure_environment(environment: str, google_drive_dir: str) -> Environmen
     if environment != 'colab':
         raise ValueError(f"Environment '{environment}' not supported")
         
-    # Configure Git credentials
+    # Configure Git credentials (direct subprocess calls - no shell fork)
     github_email = userdata.get('GITHUB_EMAIL')
     github_username = userdata.get('GITHUB_USER_NAME')
-    os.system(f'git config --global user.email "{github_email}"')
-    os.system(f'git config --global user.name "{github_username}"')
+    subprocess.run(['git', 'config', '--global', 'user.email', github_email],
+                   check=True)
+    subprocess.run(['git', 'config', '--global', 'user.name', github_username],
+                   check=True)
     
     # Set up environment components
     auth.authenticate_user()
@@ -205,7 +223,9 @@ def configure_environment(environment: str, google_drive_dir: str) -> Environmen
     # Set up GCP if available
     gcp_config = get_gcp_config()
     if gcp_config:
-        os.system(f'gcloud config set project {gcp_config["project_id"]}')
+        subprocess.run(
+            ['gcloud', 'config', 'set', 'project', gcp_config['project_id']],
+            check=True)
         logger.info("GCP Project configured")
     
     # Create and return configuration